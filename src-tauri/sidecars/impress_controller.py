@@ -2,11 +2,14 @@
 """
 LibreOffice Impress controller sidecar for Sermon Helper.
 
-Communicates via stdin/stdout JSON messages.
+Communicates via stdin/stdout JSON messages, or over a Unix domain socket
+in --listen mode so several UI channels (main window, preview, web remote)
+can pipeline commands independently.
 Connects to LibreOffice via UNO socket on localhost:2002.
 
 Usage:
     python3 impress_controller.py
+    python3 impress_controller.py --listen /path/to/impress.sock
 
 Commands (JSON on stdin, one per line):
     {"command": "is_running"}
@@ -24,43 +27,111 @@ Commands (JSON on stdin, one per line):
 """
 
 import json
+import select
+import shutil
+import socket
 import subprocess
 import sys
+import threading
 import os
+import time
 
-# UNO imports - available when LibreOffice is installed
+# orjson is ~3-5x faster on both encode and decode and emits bytes directly;
+# fall back to the stdlib json when it isn't installed
 try:
-    import uno
-    from com.sun.star.beans import PropertyValue
-    HAS_UNO = True
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+
+    def _dumps(obj):
+        return orjson.dumps(obj)
 except ImportError:
-    HAS_UNO = False
+
+    def _loads(data):
+        return json.loads(data)
+
+    def _dumps(obj):
+        return json.dumps(obj).encode("utf-8")
+
+# UNO is imported lazily: pyuno pulls in the LibreOffice runtime, which
+# costs hundreds of milliseconds, and commands like is_running never need
+# it. HAS_UNO stays None until the first import attempt.
+uno = None
+HAS_UNO = None
+
+
+def _import_uno():
+    """Import pyuno on first use. Returns True when UNO is available."""
+    global uno, HAS_UNO
+    if HAS_UNO is None:
+        try:
+            import uno as _uno
+            uno = _uno
+            HAS_UNO = True
+        except ImportError:
+            HAS_UNO = False
+    return HAS_UNO
 
 UNO_PORT = 2002
 
+# Cached UNO connection state. Resolving the UNO URL opens a TCP connection
+# and negotiates a session, so keep it across commands and reconnect only
+# after an RPC failure.
+_ctx = None
+_desktop = None
+
+
+def _invalidate():
+    """Drop the cached UNO connection so the next command reconnects."""
+    global _ctx, _desktop
+    _ctx = None
+    _desktop = None
+
+
+def _uno_port_open(timeout=0.2):
+    """Cheap liveness probe: plain TCP connect to the UNO port.
+
+    Answers "is LibreOffice up?" without paying for a full UNO resolve.
+    """
+    probe = socket.socket()
+    probe.settimeout(timeout)
+    try:
+        probe.connect(("localhost", UNO_PORT))
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
 
 def get_uno_context():
-    """Connect to LibreOffice UNO socket."""
-    if not HAS_UNO:
+    """Connect to LibreOffice UNO socket (cached across commands)."""
+    global _ctx
+    if _ctx is not None:
+        return _ctx
+    if not _import_uno():
         return None
     try:
         local_ctx = uno.getComponentContext()
         resolver = local_ctx.ServiceManager.createInstanceWithContext(
             "com.sun.star.bridge.UnoUrlResolver", local_ctx
         )
-        ctx = resolver.resolve(
+        _ctx = resolver.resolve(
             f"uno:socket,host=localhost,port={UNO_PORT};urp;StarOffice.ComponentContext"
         )
-        return ctx
+        return _ctx
     except Exception:
         return None
 
 
 def get_desktop(ctx):
-    """Get the LibreOffice desktop from a UNO context."""
-    smgr = ctx.ServiceManager
-    desktop = smgr.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
-    return desktop
+    """Get the LibreOffice desktop from a UNO context (cached across commands)."""
+    global _desktop
+    if _desktop is None:
+        smgr = ctx.ServiceManager
+        _desktop = smgr.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+    return _desktop
 
 
 def get_slideshow_controller(desktop):
@@ -88,224 +159,503 @@ def get_presentation(desktop):
         return None
 
 
-def respond(success, error=None, **kwargs):
-    """Send a JSON response to stdout."""
-    resp = {"success": success}
-    if error:
-        resp["error"] = error
-    resp.update(kwargs)
-    print(json.dumps(resp), flush=True)
+# Per-thread response stream: stdout for the main loop, the client socket
+# for --listen worker threads.
+_output = threading.local()
+
+
+def respond(success, **fields):
+    """Send a JSON response to the current thread's output stream.
+
+    Keyword arguments become response fields directly; this is the hottest
+    write path (get_status polling), so build exactly one dict and write
+    the encoded bytes without intermediate concatenation.
+    """
+    fields["success"] = success
+    buf = getattr(_output, "stream", None) or sys.stdout.buffer
+    buf.write(_dumps(fields))
+    buf.write(b"\n")
+    buf.flush()
+
 
+def launch_libreoffice_with_socket():
+    """Launch LibreOffice Impress with UNO socket enabled.
 
-def launch_libreoffice_with_socket(file_path=None):
-    """Launch LibreOffice Impress with UNO socket enabled."""
+    Prefers os.posix_spawn, which skips fork()ing this process first — once
+    pyuno is loaded the transient copy-on-write footprint of a fork is
+    considerable. Falls back to subprocess.Popen where posix_spawn is
+    unavailable (Windows).
+    """
     cmd = [
         "soffice",
         "--impress",
         f"--accept=socket,host=localhost,port={UNO_PORT};urp;",
     ]
-    if file_path:
-        cmd.append(file_path)
     try:
-        subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if hasattr(os, "posix_spawn"):
+            soffice = shutil.which("soffice")
+            if soffice is None:
+                return False
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            try:
+                os.posix_spawn(
+                    soffice,
+                    cmd,
+                    os.environ,
+                    file_actions=[
+                        (os.POSIX_SPAWN_DUP2, devnull, 1),
+                        (os.POSIX_SPAWN_DUP2, devnull, 2),
+                    ],
+                )
+            finally:
+                os.close(devnull)
+        else:
+            subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         return True
-    except Exception as e:
+    except Exception:
         return False
 
 
+def _wait_for_uno_socket(max_wait=10.0):
+    """Poll the UNO port with a fast initial backoff until it accepts.
+
+    Returns True once the socket is up, False after ~max_wait seconds.
+    """
+    deadline = time.monotonic() + max_wait
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if _uno_port_open():
+            return True
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, 1.0)
+    return _uno_port_open()
+
+
+class CommandError(Exception):
+    """Expected command failure whose message is returned to the caller."""
+
+
+def _require_ctx():
+    """Return the UNO context or raise a CommandError."""
+    ctx = get_uno_context()
+    if ctx is None:
+        raise CommandError("LibreOffice is not running or UNO socket not available")
+    return ctx
+
+
+def _require_controller():
+    """Return the active slideshow controller or raise a CommandError."""
+    controller = get_slideshow_controller(get_desktop(_require_ctx()))
+    if controller is None:
+        raise CommandError("No slideshow active")
+    return controller
+
+
+def _h_is_running(cmd_data):
+    running = _uno_port_open()
+    if not running:
+        # LibreOffice is gone; make sure the next command reconnects
+        _invalidate()
+    return {"running": running}
+
+
+def _h_open(cmd_data):
+    file_path = cmd_data.get("file_path", "")
+    if not os.path.exists(file_path):
+        raise CommandError(f"File not found: {file_path}")
+
+    ctx = get_uno_context()
+    if ctx is None:
+        # Launch LibreOffice and wait until its UNO socket accepts, so
+        # the document is opened through UNO and follow-up commands
+        # (e.g. start_slideshow) don't race a half-started instance.
+        if not launch_libreoffice_with_socket():
+            raise CommandError("Failed to launch LibreOffice")
+        if not _wait_for_uno_socket():
+            raise CommandError("LibreOffice did not become ready in time")
+        ctx = _require_ctx()
+
+    desktop = get_desktop(ctx)
+    desktop.loadComponentFromURL("file://" + file_path, "_blank", 0, ())
+
+
+def _h_start_slideshow(cmd_data):
+    desktop = get_desktop(_require_ctx())
+    presentation = get_presentation(desktop)
+    if presentation is None:
+        raise CommandError("No presentation document open")
+    from_slide = cmd_data.get("from_slide")
+    if from_slide is not None:
+        # UNO uses 0-based index for slides
+        # But we'll start from beginning and then goto
+        presentation.start()
+        # The controller appears as soon as the show has actually started;
+        # poll for it instead of sleeping a fixed half second
+        deadline = time.monotonic() + 2.0
+        controller = None
+        while time.monotonic() < deadline:
+            controller = get_slideshow_controller(desktop)
+            if controller is not None:
+                break
+            time.sleep(0.01)
+        if controller:
+            controller.gotoSlideIndex(from_slide - 1)
+    else:
+        presentation.start()
+
+
+def _h_stop_slideshow(cmd_data):
+    presentation = get_presentation(get_desktop(_require_ctx()))
+    if presentation and presentation.isRunning():
+        presentation.end()
+
+
+def _h_next(cmd_data):
+    _require_controller().gotoNextSlide()
+
+
+def _h_previous(cmd_data):
+    _require_controller().gotoPreviousSlide()
+
+
+def _h_goto_slide(cmd_data):
+    slide_number = cmd_data.get("slide_number", 1)
+    _require_controller().gotoSlideIndex(slide_number - 1)  # 0-based
+
+
+def _h_blank_screen(cmd_data):
+    _require_controller().blankScreen(0x000000)  # Black
+
+
+def _h_white_screen(cmd_data):
+    _require_controller().blankScreen(0xFFFFFF)  # White
+
+
+def _h_unblank(cmd_data):
+    _require_controller().resume()
+
+
+def _h_get_status(cmd_data):
+    desktop = get_desktop(_require_ctx())
+    doc = desktop.getCurrentComponent()
+    slideshow_active = False
+    current_slide = None
+    total_slides = None
+    blanked = False
+
+    if doc is not None:
+        try:
+            total_slides = doc.getDrawPages().getCount()
+        except Exception:
+            pass
+
+        # Walk doc -> presentation -> controller once; each attribute
+        # access is a synchronous UNO round-trip, and the helper
+        # functions would re-resolve the document for every field.
+        try:
+            presentation = doc.getPresentation()
+        except Exception:
+            presentation = None
+        if presentation and presentation.isRunning():
+            slideshow_active = True
+            controller = presentation.getController()
+            if controller:
+                current_slide = controller.getCurrentSlideIndex() + 1  # 1-based
+                blanked = controller.isPaused()
+
+    return {"data": {
+        "slideshow_active": slideshow_active,
+        "current_slide": current_slide,
+        "total_slides": total_slides,
+        "blanked": blanked,
+    }}
+
+
+HANDLERS = {
+    "is_running": _h_is_running,
+    "open": _h_open,
+    "start_slideshow": _h_start_slideshow,
+    "stop_slideshow": _h_stop_slideshow,
+    "next": _h_next,
+    "previous": _h_previous,
+    "goto_slide": _h_goto_slide,
+    "blank_screen": _h_blank_screen,
+    "white_screen": _h_white_screen,
+    "unblank": _h_unblank,
+    "get_status": _h_get_status,
+}
+
+
 def handle_command(cmd_data):
-    """Process a single command."""
+    """Process a single command via the handler table.
+
+    Handlers return an optional dict of extra response fields; expected
+    failures raise CommandError, anything else invalidates the cached UNO
+    connection before reporting the error.
+    """
     command = cmd_data.get("command", "")
 
     if command == "quit":
         respond(True)
         sys.exit(0)
 
-    if command == "is_running":
-        ctx = get_uno_context()
-        respond(True, running=ctx is not None)
+    handler = HANDLERS.get(command)
+    if handler is None:
+        respond(False, error=f"Unknown command: {command}")
         return
 
-    if command == "open":
-        file_path = cmd_data.get("file_path", "")
-        if not os.path.exists(file_path):
-            respond(False, error=f"File not found: {file_path}")
-            return
+    try:
+        fields = handler(cmd_data)
+        respond(True, **(fields or {}))
+    except CommandError as e:
+        respond(False, error=str(e))
+    except Exception as e:
+        _invalidate()
+        respond(False, error=str(e))
 
-        ctx = get_uno_context()
-        if ctx is None:
-            # Try to launch LibreOffice with socket
-            if launch_libreoffice_with_socket(file_path):
-                respond(True)
-            else:
-                respond(False, error="Failed to launch LibreOffice")
-            return
 
-        try:
-            desktop = get_desktop(ctx)
-            url = "file://" + file_path
-            props = []
-            desktop.loadComponentFromURL(url, "_blank", 0, tuple(props))
-            respond(True)
-        except Exception as e:
-            respond(False, error=str(e))
-        return
+def _handle_navigation_batch(commands):
+    """Collapse a run of queued next/previous commands into one slide jump.
+
+    Emits one response per original command so the caller's request/response
+    pairing stays intact.
+    """
+    count = len(commands)
+    offset = sum(1 if c == "next" else -1 for c in commands)
 
-    # All remaining commands need UNO connection
     ctx = get_uno_context()
     if ctx is None:
-        respond(False, error="LibreOffice is not running or UNO socket not available")
+        for _ in range(count):
+            respond(False, error="LibreOffice is not running or UNO socket not available")
         return
 
-    desktop = get_desktop(ctx)
-
-    if command == "start_slideshow":
-        try:
-            presentation = get_presentation(desktop)
-            if presentation is None:
-                respond(False, error="No presentation document open")
-                return
-            from_slide = cmd_data.get("from_slide")
-            if from_slide is not None:
-                # UNO uses 0-based index for slides
-                # But we'll start from beginning and then goto
-                presentation.start()
-                import time
-                time.sleep(0.5)
-                controller = get_slideshow_controller(desktop)
-                if controller:
-                    controller.gotoSlideIndex(from_slide - 1)
-            else:
-                presentation.start()
-            respond(True)
-        except Exception as e:
-            respond(False, error=str(e))
-
-    elif command == "stop_slideshow":
-        try:
-            presentation = get_presentation(desktop)
-            if presentation and presentation.isRunning():
-                presentation.end()
-            respond(True)
-        except Exception as e:
-            respond(False, error=str(e))
-
-    elif command == "next":
-        try:
-            controller = get_slideshow_controller(desktop)
-            if controller is None:
+    try:
+        desktop = get_desktop(ctx)
+        controller = get_slideshow_controller(desktop)
+        if controller is None:
+            for _ in range(count):
                 respond(False, error="No slideshow active")
-                return
+            return
+        if offset == 1:
             controller.gotoNextSlide()
-            respond(True)
-        except Exception as e:
-            respond(False, error=str(e))
-
-    elif command == "previous":
-        try:
-            controller = get_slideshow_controller(desktop)
-            if controller is None:
-                respond(False, error="No slideshow active")
-                return
+        elif offset == -1:
             controller.gotoPreviousSlide()
+        elif offset != 0:
+            # Clamp to the deck bounds: overshooting past the last slide is
+            # ignored (or raises) by UNO, whereas sequential gotoNextSlide
+            # calls would stop cleanly at the last slide
+            target = controller.getCurrentSlideIndex() + offset
+            target = max(0, min(target, controller.getSlideCount() - 1))
+            controller.gotoSlideIndex(target)
+        for _ in range(count):
             respond(True)
-        except Exception as e:
+    except Exception as e:
+        _invalidate()
+        for _ in range(count):
             respond(False, error=str(e))
 
-    elif command == "goto_slide":
-        try:
-            controller = get_slideshow_controller(desktop)
-            if controller is None:
-                respond(False, error="No slideshow active")
-                return
-            slide_number = cmd_data.get("slide_number", 1)
-            controller.gotoSlideIndex(slide_number - 1)  # 0-based
-            respond(True)
-        except Exception as e:
-            respond(False, error=str(e))
 
-    elif command == "blank_screen":
-        try:
-            controller = get_slideshow_controller(desktop)
-            if controller is None:
-                respond(False, error="No slideshow active")
-                return
-            controller.blankScreen(0x000000)  # Black
-            respond(True)
-        except Exception as e:
-            respond(False, error=str(e))
+def _handle_one(cmd_data):
+    """Handle a single parsed command, reporting unexpected failures."""
+    try:
+        handle_command(cmd_data)
+    except SystemExit:
+        raise
+    except Exception as e:
+        respond(False, error=f"Unexpected error: {e}")
 
-    elif command == "white_screen":
-        try:
-            controller = get_slideshow_controller(desktop)
-            if controller is None:
-                respond(False, error="No slideshow active")
-                return
-            controller.blankScreen(0xFFFFFF)  # White
-            respond(True)
-        except Exception as e:
-            respond(False, error=str(e))
 
-    elif command == "unblank":
-        try:
-            controller = get_slideshow_controller(desktop)
-            if controller is None:
-                respond(False, error="No slideshow active")
-                return
-            controller.resume()
-            respond(True)
-        except Exception as e:
-            respond(False, error=str(e))
+class _ParseError:
+    """Marks a line that failed to parse.
 
-    elif command == "get_status":
-        try:
-            doc = desktop.getCurrentComponent()
-            slideshow_active = False
-            current_slide = None
-            total_slides = None
-            blanked = False
+    A dedicated type so valid JSON that merely isn't an object (e.g. a bare
+    string) can't be mistaken for an error message.
+    """
 
-            if doc is not None:
-                try:
-                    total_slides = doc.getDrawPages().getCount()
-                except Exception:
-                    pass
-
-                presentation = get_presentation(desktop)
-                if presentation and presentation.isRunning():
-                    slideshow_active = True
-                    controller = get_slideshow_controller(desktop)
-                    if controller:
-                        current_slide = controller.getCurrentSlideIndex() + 1  # 1-based
-                        blanked = controller.isPaused()
-
-            respond(True, data={
-                "slideshow_active": slideshow_active,
-                "current_slide": current_slide,
-                "total_slides": total_slides,
-                "blanked": blanked,
-            })
-        except Exception as e:
-            respond(False, error=str(e))
+    def __init__(self, message):
+        self.message = message
 
-    else:
-        respond(False, error=f"Unknown command: {command}")
 
+def _dispatch_lines(lines):
+    """Parse and dispatch a batch of input lines in order.
 
-def main():
-    """Main loop: read JSON commands from stdin, respond on stdout."""
+    Consecutive next/previous commands are coalesced into a single UNO call
+    (a held-down arrow key queues several per select() wakeup).
+    """
+    parsed = []
+    for line in lines:
+        if not line:
+            continue
+        try:
+            parsed.append(_loads(line))
+        except ValueError as e:
+            parsed.append(_ParseError(f"Invalid JSON: {e}"))
+
+    i = 0
+    while i < len(parsed):
+        cmd_data = parsed[i]
+        if isinstance(cmd_data, _ParseError):
+            respond(False, error=cmd_data.message)
+            i += 1
+            continue
+        if not isinstance(cmd_data, dict):
+            respond(False, error="Invalid command: expected a JSON object")
+            i += 1
+            continue
+
+        if cmd_data.get("command") in ("next", "previous"):
+            run = []
+            while (
+                i < len(parsed)
+                and isinstance(parsed[i], dict)
+                and parsed[i].get("command") in ("next", "previous")
+            ):
+                run.append(parsed[i]["command"])
+                i += 1
+            if len(run) > 1:
+                _handle_navigation_batch(run)
+            else:
+                _handle_one(cmd_data)
+            continue
+
+        _handle_one(cmd_data)
+        i += 1
+
+
+def _drain_stdin(buffer):
+    """Read everything currently pending on stdin without blocking.
+
+    Accumulates raw bytes and decodes per line, so a multibyte UTF-8
+    character split across read chunks survives intact.
+    Returns (complete_lines, remaining_partial_line_bytes, eof).
+    """
+    fd = sys.stdin.fileno()
+    eof = False
+    while True:
+        readable, _, _ = select.select([sys.stdin], [], [], 0)
+        if not readable:
+            break
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            eof = True
+            break
+        buffer += chunk
+    raw_lines = buffer.split(b"\n")
+    lines = [line.decode("utf-8", errors="replace").strip() for line in raw_lines[:-1]]
+    return lines, raw_lines[-1], eof
+
+
+def _blocking_loop():
+    """Simple blocking stdin loop (used where select() on pipes is unavailable)."""
     for line in sys.stdin:
         line = line.strip()
         if not line:
             continue
         try:
-            cmd_data = json.loads(line)
+            cmd_data = _loads(line)
             handle_command(cmd_data)
-        except json.JSONDecodeError as e:
+        except ValueError as e:
             respond(False, error=f"Invalid JSON: {e}")
         except Exception as e:
             respond(False, error=f"Unexpected error: {e}")
 
 
+def _serve_connection(conn, uno_lock):
+    """Handle one --listen client: JSON commands line-delimited, as on stdin.
+
+    UNO work is serialized through uno_lock, but is_running (a plain TCP
+    probe) bypasses it so liveness polls never wait behind a slow command
+    on another connection.
+    """
+    _output.stream = conn.makefile("wb")
+    buffer = b""
+    try:
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    cmd_data = _loads(line)
+                except ValueError as e:
+                    respond(False, error=f"Invalid JSON: {e}")
+                    continue
+                try:
+                    if isinstance(cmd_data, dict) and cmd_data.get("command") == "is_running":
+                        _handle_one(cmd_data)
+                    else:
+                        with uno_lock:
+                            _handle_one(cmd_data)
+                except SystemExit:
+                    # quit shuts down the whole controller, not just this client
+                    os._exit(0)
+    except OSError:
+        pass
+    finally:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+def _listen_loop(sock_path):
+    """Accept connections on a Unix socket, one worker thread per client."""
+    try:
+        os.unlink(sock_path)
+    except FileNotFoundError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(sock_path)
+    server.listen()
+
+    uno_lock = threading.Lock()
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(
+            target=_serve_connection, args=(conn, uno_lock), daemon=True
+        ).start()
+
+
+def main():
+    """Main loop: read JSON commands from stdin, respond on stdout.
+
+    Uses select() so idle time can pre-warm the UNO connection, and drains
+    all queued input in one pass so rapid-fire navigation commands collapse
+    into a single slide jump instead of one UNO round-trip each.
+
+    With --listen <path>, serves the same protocol over a Unix socket so
+    multiple clients can pipeline commands independently.
+    """
+    if len(sys.argv) >= 3 and sys.argv[1] == "--listen":
+        _listen_loop(sys.argv[2])
+        return
+
+    if os.name != "posix":
+        # select() only works on sockets on Windows, not pipes
+        _blocking_loop()
+        return
+
+    buffer = b""
+    while True:
+        readable, _, _ = select.select([sys.stdin], [], [], 0.5)
+        if not readable:
+            # Idle: pre-warm the UNO connection so the next command is fast
+            if _ctx is None:
+                get_uno_context()
+            continue
+        lines, buffer, eof = _drain_stdin(buffer)
+        if eof and buffer.strip():
+            lines.append(buffer.decode("utf-8", errors="replace").strip())
+            buffer = b""
+        _dispatch_lines(lines)
+        if eof:
+            break
+
+
 if __name__ == "__main__":
     main()
@@ -6,9 +6,10 @@
 use aes::Aes128;
 use cipher::{BlockDecrypt, BlockEncrypt, KeyInit, generic_array::GenericArray};
 use serde::{Deserialize, Serialize};
-use std::collections::HashSet;
+use std::collections::{HashMap, HashSet};
 use std::net::{IpAddr, Ipv4Addr, SocketAddr, UdpSocket};
 use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::{Mutex, OnceLock};
 use std::time::{Duration, Instant};
 
 /// Default Broadlink encryption key (before auth)
@@ -23,6 +24,108 @@ const DEFAULT_IV: [u8; 16] = [
     0xdd, 0xb3, 0xba, 0x69, 0x5a, 0x2e, 0x6f, 0x58,
 ];
 
+/// Cache key for an authenticated session: (host, mac, devtype)
+type SessionKey = (String, String, u16);
+
+/// Cached auth sessions (device id + negotiated key), keyed by [`SessionKey`].
+///
+/// Broadlink auth tokens stay valid for the device's uptime, so reusing one
+/// skips the auth round-trip — the dominant latency of a LAN send. A stale
+/// entry is detected on first use and replaced by a fresh handshake.
+fn session_cache() -> &'static Mutex<HashMap<SessionKey, ([u8; 4], [u8; 16])>> {
+    static CACHE: OnceLock<Mutex<HashMap<SessionKey, ([u8; 4], [u8; 16])>>> = OnceLock::new();
+    CACHE.get_or_init(|| Mutex::new(HashMap::new()))
+}
+
+/// Connected devices kept alive across commands, keyed by [`SessionKey`].
+///
+/// Reusing the device keeps its bound UDP socket, authenticated session and
+/// packet counter for the lifetime of the app, so a repeated command (e.g. a
+/// button press) costs a single request/response exchange instead of a full
+/// socket setup + auth handshake.
+fn device_cache() -> &'static Mutex<HashMap<SessionKey, BroadlinkDevice>> {
+    static CACHE: OnceLock<Mutex<HashMap<SessionKey, BroadlinkDevice>>> = OnceLock::new();
+    CACHE.get_or_init(|| Mutex::new(HashMap::new()))
+}
+
+/// Decoded IR/RF codes keyed by their hex string.
+///
+/// A remote has a handful of codes that get sent over and over (volume,
+/// power, navigation), so skip re-parsing the few-hundred-byte hex string
+/// after the first press. Bounded so arbitrary input can't grow it forever.
+fn code_cache() -> &'static Mutex<HashMap<String, Vec<u8>>> {
+    static CACHE: OnceLock<Mutex<HashMap<String, Vec<u8>>>> = OnceLock::new();
+    CACHE.get_or_init(|| Mutex::new(HashMap::new()))
+}
+
+const CODE_CACHE_MAX: usize = 128;
+
+/// Decode a hex code string, consulting the code cache first
+fn decode_code(code: &str) -> Result<Vec<u8>, String> {
+    if let Some(bytes) = code_cache().lock().unwrap().get(code) {
+        return Ok(bytes.clone());
+    }
+    let bytes = hex::decode(code).map_err(|e| format!("Invalid hex code: {}", e))?;
+    let mut cache = code_cache().lock().unwrap();
+    if cache.len() < CODE_CACHE_MAX {
+        cache.insert(code.to_string(), bytes.clone());
+    }
+    Ok(bytes)
+}
+
+/// Adaptive polling interval for learn loops: starts fast (20ms) so a
+/// received signal is detected with minimal latency, then backs off
+/// toward 200ms to keep network traffic low while waiting.
+struct PollBackoff {
+    interval: Duration,
+    max: Duration,
+}
+
+impl PollBackoff {
+    fn new() -> Self {
+        PollBackoff {
+            interval: Duration::from_millis(20),
+            max: Duration::from_millis(200),
+        }
+    }
+
+    /// Sleep for the current interval (clamped to the deadline), then grow
+    /// the interval by 1.5x up to the maximum.
+    ///
+    /// The sleep is taken in short slices with the learn-cancel flag checked
+    /// between them, so a cancel request takes effect within ~20ms instead
+    /// of waiting out the full interval. Returns true when cancelled.
+    fn sleep(&mut self, deadline: Instant) -> bool {
+        let now = Instant::now();
+        if now >= deadline {
+            return LEARN_CANCEL.load(Ordering::SeqCst);
+        }
+        let slice = Duration::from_millis(20);
+        let mut remaining = self.interval.min(deadline - now);
+        while remaining > Duration::ZERO {
+            if LEARN_CANCEL.load(Ordering::SeqCst) {
+                return true;
+            }
+            let step = remaining.min(slice);
+            std::thread::sleep(step);
+            remaining -= step;
+        }
+        self.interval = (self.interval * 3 / 2).min(self.max);
+        LEARN_CANCEL.load(Ordering::SeqCst)
+    }
+}
+
+/// Transport-level failure classification for a request/response exchange
+enum ExchangeError {
+    /// send() failed or recv() hit a connection-level error — the socket
+    /// itself is suspect and rebuilding + retrying is safe
+    Socket(String),
+    /// recv() timed out — the device may have received (and executed) the
+    /// request with only the response lost, so a blind resend could
+    /// double-fire a command and must not happen
+    Timeout(String),
+}
+
 /// Raw Broadlink device handler for direct protocol communication
 struct BroadlinkDevice {
     socket: UdpSocket,
@@ -32,6 +135,9 @@ struct BroadlinkDevice {
     iv: [u8; 16],
     id: [u8; 4],
     count: u16,
+    session_key: SessionKey,
+    /// True while running on a cached session that has not been verified yet
+    cached_session: bool,
 }
 
 impl BroadlinkDevice {
@@ -42,20 +148,10 @@ impl BroadlinkDevice {
 
         // Parse MAC address - use as-is from discovery response (no reversal needed)
         // The MAC bytes from discovery are already in the correct format for packets
-        let mac_bytes: Vec<u8> = mac.split(':')
-            .map(|s| u8::from_str_radix(s, 16).unwrap_or(0))
-            .collect();
-        let mut device_mac = [0u8; 6];
-        if mac_bytes.len() == 6 {
-            device_mac.copy_from_slice(&mac_bytes);
-        }
+        let device_mac = parse_mac(mac).unwrap_or([0u8; 6]);
 
         // Parse device type (e.g., "0x520b")
-        let device_type = if devtype.starts_with("0x") {
-            u16::from_str_radix(&devtype[2..], 16).unwrap_or(0)
-        } else {
-            devtype.parse().unwrap_or(0)
-        };
+        let device_type = parse_devtype(devtype);
 
         // Bind socket to specific local IP (required for proper routing on Windows with multiple interfaces)
         let bind_addr = SocketAddr::new(local_ip.into(), 0);
@@ -85,10 +181,21 @@ impl BroadlinkDevice {
             iv: DEFAULT_IV,
             id: [0, 0, 0, 0],
             count: 0,
+            session_key: (host.to_string(), mac.to_string(), device_type),
+            cached_session: false,
         };
 
-        // Authenticate
-        dev.auth()?;
+        // Reuse a cached session if we have one; otherwise authenticate.
+        // A stale cached session is re-negotiated on first use.
+        let cached = session_cache().lock().unwrap().get(&dev.session_key).copied();
+        if let Some((id, key)) = cached {
+            tracing::info!("Reusing cached Broadlink session for {}", host);
+            dev.id = id;
+            dev.key = key;
+            dev.cached_session = true;
+        } else {
+            dev.auth()?;
+        }
 
         Ok(dev)
     }
@@ -143,6 +250,49 @@ impl BroadlinkDevice {
         Ok(result)
     }
 
+    /// Recreate the UDP socket, preserving the local IP and peer address.
+    ///
+    /// A socket held by the device cache can go stale across a suspend or
+    /// an interface change; rebuilding is cheaper than dropping the whole
+    /// authenticated session.
+    fn rebuild_socket(&mut self) -> Result<(), String> {
+        let local_ip = self.socket.local_addr()
+            .map_err(|e| format!("Failed to read local addr: {}", e))?
+            .ip();
+        let peer = self.socket.peer_addr()
+            .map_err(|e| format!("Failed to read peer addr: {}", e))?;
+
+        let socket = UdpSocket::bind(SocketAddr::new(local_ip, 0))
+            .map_err(|e| format!("Failed to bind socket: {}", e))?;
+        socket.set_broadcast(true)
+            .map_err(|e| format!("Failed to set broadcast: {}", e))?;
+        socket.set_read_timeout(Some(Duration::from_secs(10)))
+            .map_err(|e| format!("Failed to set timeout: {}", e))?;
+        socket.connect(peer)
+            .map_err(|e| format!("Failed to connect socket: {}", e))?;
+
+        self.socket = socket;
+        Ok(())
+    }
+
+    /// One request/response exchange on the device socket
+    fn exchange(&self, packet: &[u8], buf: &mut [u8]) -> Result<usize, ExchangeError> {
+        let sent = self.socket.send(packet)
+            .map_err(|e| ExchangeError::Socket(format!("Send failed: {}", e)))?;
+        tracing::debug!("Sent {} bytes", sent);
+
+        self.socket.recv(buf).map_err(|e| {
+            if matches!(
+                e.kind(),
+                std::io::ErrorKind::WouldBlock | std::io::ErrorKind::TimedOut
+            ) {
+                ExchangeError::Timeout(format!("Receive failed: {}", e))
+            } else {
+                ExchangeError::Socket(format!("Receive failed: {}", e))
+            }
+        })
+    }
+
     /// Send a command packet to the device
     fn send_packet(&mut self, command: u8, payload: &[u8]) -> Result<Vec<u8>, String> {
         self.count = self.count.wrapping_add(1);
@@ -205,20 +355,28 @@ impl BroadlinkDevice {
         tracing::debug!("Device ID: {:02x?}, count: {}", &self.id, self.count);
         tracing::debug!("Packet header (first 56 bytes): {:02x?}", &packet[..0x38.min(packet.len())]);
 
-        // Send (using send() since we used connect())
-        let sent = self.socket.send(&packet)
-            .map_err(|e| format!("Send failed: {}", e))?;
-        tracing::debug!("Sent {} bytes", sent);
-
-        // Receive response
+        // Exchange (using send() since we used connect()); on a
+        // connection-level error, rebuild the socket once and retry in case
+        // a cached socket went stale (suspend, interface change). A recv
+        // timeout is never retried: the device may have executed the command
+        // with only the response lost, and a resend could double-fire it.
         let mut buf = [0u8; 2048];
-        let len = self.socket.recv(&mut buf)
-            .map_err(|e| {
-                tracing::error!("Receive failed (timeout or error): {}", e);
-                format!("Receive failed: {}", e)
-            })?;
-        tracing::debug!("Received {} bytes", len);
-
+        let len = match self.exchange(&packet, &mut buf) {
+            Ok(len) => len,
+            Err(ExchangeError::Timeout(e)) => {
+                tracing::error!("Receive timed out: {}", e);
+                return Err(e);
+            }
+            Err(ExchangeError::Socket(e)) => {
+                tracing::warn!("Socket I/O failed ({}), rebuilding socket and retrying", e);
+                self.rebuild_socket()?;
+                self.exchange(&packet, &mut buf).map_err(|err| {
+                    let (ExchangeError::Socket(e) | ExchangeError::Timeout(e)) = err;
+                    tracing::error!("Exchange failed after socket rebuild: {}", e);
+                    e
+                })?
+            }
+        };
         tracing::debug!("Received response: {} bytes", len);
 
         if len < 0x38 {
@@ -270,9 +428,37 @@ impl BroadlinkDevice {
         tracing::info!("Authenticated with device, session ID: {:02x?}, new key: {:02x?}",
             self.id, &self.key[..8]);
 
+        session_cache()
+            .lock()
+            .unwrap()
+            .insert(self.session_key.clone(), (self.id, self.key));
+
         Ok(())
     }
 
+    /// Send a packet, falling back to a fresh auth handshake once if the
+    /// cached session turns out to be stale (device rebooted, key rotated).
+    fn send_packet_reauth(&mut self, command: u8, payload: &[u8]) -> Result<Vec<u8>, String> {
+        match self.send_packet(command, payload) {
+            Ok(resp) => {
+                self.cached_session = false;
+                Ok(resp)
+            }
+            // Only a device error response proves the transport works and
+            // the cached key is stale; transport failures (device offline)
+            // must not trigger a re-auth round that doubles the timeout
+            Err(e) if self.cached_session && e.starts_with("Device error:") => {
+                tracing::info!("Cached session rejected ({}), re-authenticating", e);
+                self.cached_session = false;
+                self.key = DEFAULT_KEY;
+                self.id = [0, 0, 0, 0];
+                self.auth()?;
+                self.send_packet(command, payload)
+            }
+            Err(e) => Err(e),
+        }
+    }
+
     /// Encode command for RM4 devices (length-prefixed format)
     /// Format: 2 bytes length (little-endian) + 4 bytes command (little-endian) + data
     fn encode_rm4_command(&self, command: u32, data: &[u8]) -> Vec<u8> {
@@ -312,23 +498,21 @@ impl BroadlinkDevice {
         tracing::info!("Sending enter learning mode command (RM4 format)...");
         let payload = self.encode_rm4_command(0x03, &[]);
         tracing::debug!("RM4 command payload: {:02x?}", payload);
-        let response = self.send_packet(0x6a, &payload)?;
+        let response = self.send_packet_reauth(0x6a, &payload)?;
         tracing::info!("Enter learning response: {} bytes, data: {:02x?}",
             response.len(), &response[..response.len().min(20)]);
 
         tracing::info!("Entered IR learning mode, waiting for signal...");
 
-        // Poll for data (up to 30 seconds)
-        let start = Instant::now();
-        let timeout = Duration::from_secs(30);
+        // Poll for data (up to 30 seconds), fast at first then backing off
+        let deadline = Instant::now() + Duration::from_secs(30);
+        let mut backoff = PollBackoff::new();
 
-        while start.elapsed() < timeout {
+        while Instant::now() < deadline {
             if LEARN_CANCEL.load(Ordering::SeqCst) {
                 return Err("Learning cancelled".to_string());
             }
 
-            std::thread::sleep(Duration::from_millis(500));
-
             // Check for data - RM4 format: command 0x04
             // Note: RM4 devices may return error 0xfffb when no data is available yet
             let check_payload = self.encode_rm4_command(0x04, &[]);
@@ -352,6 +536,10 @@ impl BroadlinkDevice {
                     }
                 }
             }
+
+            if backoff.sleep(deadline) {
+                return Err("Learning cancelled".to_string());
+            }
         }
 
         Err("Learning timeout - no signal received".to_string())
@@ -361,22 +549,20 @@ impl BroadlinkDevice {
     fn learn_rf(&mut self) -> Result<Vec<u8>, String> {
         // RF learning - sweep frequency (RM4 format: command 0x19)
         let payload = self.encode_rm4_command(0x19, &[]);
-        self.send_packet(0x6a, &payload)?;
+        self.send_packet_reauth(0x6a, &payload)?;
 
         tracing::info!("RF learning: Press and hold the remote button...");
 
-        // Wait for frequency lock
-        let start = Instant::now();
-        let timeout = Duration::from_secs(30);
+        // Wait for frequency lock (up to 30 seconds), fast at first then backing off
+        let deadline = Instant::now() + Duration::from_secs(30);
+        let mut backoff = PollBackoff::new();
         let mut freq_locked = false;
 
-        while start.elapsed() < timeout && !freq_locked {
+        while Instant::now() < deadline && !freq_locked {
             if LEARN_CANCEL.load(Ordering::SeqCst) {
                 return Err("Learning cancelled".to_string());
             }
 
-            std::thread::sleep(Duration::from_millis(500));
-
             // Check frequency lock (RM4 format: command 0x1a)
             let check_payload = self.encode_rm4_command(0x1a, &[]);
             if let Ok(data) = self.send_packet(0x6a, &check_payload) {
@@ -386,6 +572,10 @@ impl BroadlinkDevice {
                     tracing::info!("RF frequency locked");
                 }
             }
+
+            if !freq_locked && backoff.sleep(deadline) {
+                return Err("Learning cancelled".to_string());
+            }
         }
 
         if !freq_locked {
@@ -399,14 +589,13 @@ impl BroadlinkDevice {
         tracing::info!("RF learning: Now tap the button briefly...");
 
         // Poll for data
-        let start = Instant::now();
-        while start.elapsed() < timeout {
+        let deadline = Instant::now() + Duration::from_secs(30);
+        let mut backoff = PollBackoff::new();
+        while Instant::now() < deadline {
             if LEARN_CANCEL.load(Ordering::SeqCst) {
                 return Err("Learning cancelled".to_string());
             }
 
-            std::thread::sleep(Duration::from_millis(500));
-
             // Check data (RM4 format: command 0x04)
             // Note: RM4 devices may return error 0xfffb when no data is available yet
             let check_payload = self.encode_rm4_command(0x04, &[]);
@@ -428,6 +617,13 @@ impl BroadlinkDevice {
                     }
                 }
             }
+
+            if backoff.sleep(deadline) {
+                // Take the device back out of learning mode before bailing
+                let cancel = self.encode_rm4_command(0x1e, &[]);
+                let _ = self.send_packet(0x6a, &cancel);
+                return Err("Learning cancelled".to_string());
+            }
         }
 
         // Cancel sweep on timeout
@@ -440,11 +636,80 @@ impl BroadlinkDevice {
     /// Send an IR/RF code (RM4 format: command 0x02 with code as data)
     fn send_code(&mut self, code: &[u8]) -> Result<(), String> {
         let payload = self.encode_rm4_command(0x02, code);
-        self.send_packet(0x6a, &payload)?;
+        self.send_packet_reauth(0x6a, &payload)?;
         Ok(())
     }
 }
 
+/// Parse a MAC address string into bytes in a single pass.
+///
+/// Accepts ':', '-' or '.' separators (or none at all); returns `None` for
+/// anything that doesn't contain exactly six hex bytes.
+fn parse_mac(mac: &str) -> Option<[u8; 6]> {
+    let mut out = [0u8; 6];
+    let mut idx = 0;
+    let mut nibbles = 0u8;
+    let mut byte = 0u8;
+    for ch in mac.chars() {
+        if matches!(ch, ':' | '-' | '.') {
+            continue;
+        }
+        let digit = ch.to_digit(16)? as u8;
+        byte = (byte << 4) | digit;
+        nibbles += 1;
+        if nibbles == 2 {
+            if idx == 6 {
+                return None;
+            }
+            out[idx] = byte;
+            idx += 1;
+            nibbles = 0;
+            byte = 0;
+        }
+    }
+    if idx == 6 && nibbles == 0 {
+        Some(out)
+    } else {
+        None
+    }
+}
+
+/// Parse a device type string ("0x520b" or plain decimal) into its code
+fn parse_devtype(devtype: &str) -> u16 {
+    if let Some(hex) = devtype.strip_prefix("0x") {
+        u16::from_str_radix(hex, 16).unwrap_or(0)
+    } else {
+        devtype.parse().unwrap_or(0)
+    }
+}
+
+/// Fetch a cached connected device, or establish a fresh connection.
+///
+/// The device is removed from the cache while in use so concurrent commands
+/// never share a socket; return it with [`checkin_device`] after a successful
+/// operation. On failure simply drop it — the next command reconnects.
+fn checkout_device(
+    host: &str,
+    mac: &str,
+    devtype: &str,
+    local_ip: Ipv4Addr,
+) -> Result<BroadlinkDevice, String> {
+    let key: SessionKey = (host.to_string(), mac.to_string(), parse_devtype(devtype));
+
+    if let Some(device) = device_cache().lock().unwrap().remove(&key) {
+        tracing::debug!("Reusing cached device connection for {}", host);
+        return Ok(device);
+    }
+
+    BroadlinkDevice::connect(host, mac, devtype, local_ip)
+}
+
+/// Return a device to the cache after a successful operation.
+fn checkin_device(device: BroadlinkDevice) {
+    let key = device.session_key.clone();
+    device_cache().lock().unwrap().insert(key, device);
+}
+
 /// Discovered Broadlink device information
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct DiscoveredDevice {
@@ -739,11 +1004,21 @@ pub async fn discover_devices(timeout: u32) -> Result<Vec<DiscoveredDevice>, Str
         let mut all_discovered = Vec::new();
         let mut seen_macs = HashSet::new();
 
-        // Try raw UDP discovery on each interface
-        for local_ip in local_ips {
-            tracing::info!("Trying raw UDP discovery on interface: {}", local_ip);
+        // Run raw UDP discovery on all interfaces in parallel — each probe
+        // blocks for the full timeout, so probing serially would multiply
+        // wall time by the interface count.
+        let handles: Vec<_> = local_ips
+            .into_iter()
+            .map(|local_ip| {
+                std::thread::spawn(move || {
+                    tracing::info!("Trying raw UDP discovery on interface: {}", local_ip);
+                    raw_discover_on_interface(local_ip, timeout_secs)
+                })
+            })
+            .collect();
 
-            let devices = raw_discover_on_interface(local_ip, timeout_secs);
+        for handle in handles {
+            let devices = handle.join().unwrap_or_default();
 
             for device in devices {
                 // Skip duplicates (device might respond on multiple interfaces)
@@ -812,9 +1087,9 @@ pub async fn learn_code(
             .ok_or_else(|| "No suitable local IP found".to_string())?;
         tracing::info!("Learning from device {} using local IP {}", ip, local_ip);
 
-        // Connect using our custom BroadlinkDevice with RM4 protocol support
+        // Reuse a cached connection where possible; fall back to a fresh one
         tracing::info!("Connecting to device...");
-        let mut device = BroadlinkDevice::connect(&host, &mac, &devtype, local_ip)?;
+        let mut device = checkout_device(&host, &mac, &devtype, local_ip)?;
 
         tracing::info!("Connected! Starting {} learning (RM4 protocol)...", signal_type);
 
@@ -828,6 +1103,7 @@ pub async fn learn_code(
         match code_result {
             Ok(code) => {
                 tracing::info!("Learned code: {} bytes", code.len());
+                checkin_device(device);
                 // Convert bytes to hex string
                 let hex_code = hex::encode(&code);
                 Ok(LearnResult {
@@ -871,25 +1147,27 @@ pub async fn send_code(
             .parse()
             .map_err(|e| format!("Invalid IP address '{}': {}", host, e))?;
 
-        // Decode the hex code
-        let code_bytes = hex::decode(&code)
-            .map_err(|e| format!("Invalid hex code: {}", e))?;
+        // Decode the hex code (cached across repeated sends of the same code)
+        let code_bytes = decode_code(&code)?;
 
         // Get the best local IP for this device
         let local_ip = get_local_ip_for_device(ip)
             .ok_or_else(|| "No suitable local IP found".to_string())?;
         tracing::info!("Sending to device {} using local IP {}", ip, local_ip);
 
-        // Connect using our custom BroadlinkDevice with RM4 protocol support
-        let mut device = BroadlinkDevice::connect(&host, &mac, &devtype, local_ip)
+        // Reuse a cached connection where possible; fall back to a fresh one
+        let mut device = checkout_device(&host, &mac, &devtype, local_ip)
             .map_err(|e| format!("Failed to connect to device: {}", e))?;
 
         // Send the code
         match device.send_code(&code_bytes) {
-            Ok(_) => Ok(SendResult {
-                success: true,
-                error: None,
-            }),
+            Ok(_) => {
+                checkin_device(device);
+                Ok(SendResult {
+                    success: true,
+                    error: None,
+                })
+            }
             Err(e) => Ok(SendResult {
                 success: false,
                 error: Some(format!("Send failed: {}", e)),
@@ -903,10 +1181,11 @@ pub async fn send_code(
 /// Test if a device is reachable using raw UDP ping
 pub async fn test_device(
     host: &str,
-    _mac: &str,
+    mac: &str,
     _devtype: &str,
 ) -> Result<bool, String> {
     let host = host.to_string();
+    let mac = mac.to_string();
 
     tokio::task::spawn_blocking(move || {
         // Parse the IP address
@@ -962,7 +1241,18 @@ pub async fn test_device(
         // Wait for response
         let mut buf = [0u8; 256];
         match socket.recv_from(&mut buf) {
-            Ok((len, _)) => Ok(len >= 0x40), // Valid response is at least 64 bytes
+            Ok((len, _)) => {
+                // Valid response is at least 64 bytes
+                if len < 0x40 {
+                    return Ok(false);
+                }
+                // The discovery response carries the MAC at 0x3a-0x3f; only
+                // report online if the reply came from the expected device
+                match parse_mac(&mac) {
+                    Some(expected) => Ok(buf[0x3a..0x40] == expected),
+                    None => Ok(true),
+                }
+            }
             Err(_) => Ok(false),
         }
     })